@@ -1,19 +1,34 @@
 import discord
-from discord.ext import tasks
+from discord.ext import commands, tasks
+import asyncio
+import functools
 import os
 import json
+import logging
 import random
+import re
+import time
 from dotenv import load_dotenv
-from ufc_fetch import check_and_store_ufc_events, notify_todays_ufc_events, notify_weekly_ufc_events
+from ufc_fetch import AEST, check_and_store_ufc_events, notify_todays_ufc_events, notify_weekly_ufc_events, get_ufc_notify_channels
 import mysql.connector
+from db import pool
 import requests
-import matplotlib.pyplot as plt
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageDraw, ImageFont
 import io
+from datetime import datetime, time as dtime
 
 load_dotenv()
 
-intents = discord.Intents.all()
-client = discord.Client(intents=intents)
+# Root logging for the bot, ufc_fetch and discord.py alike; set LOG_LEVEL=DEBUG for per-event detail
+log_level_name = (os.getenv('LOG_LEVEL') or 'INFO').upper()
+log_level = logging.getLevelName(log_level_name)  # an int for known level names
+logging.basicConfig(
+    level=log_level if isinstance(log_level, int) else logging.INFO,
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+if not isinstance(log_level, int):
+    logging.warning("Unknown LOG_LEVEL %r; using INFO", log_level_name)
 
 prefix = os.getenv('PREFIX')
 admin_user_id = int(os.getenv('ADMIN_USER_ID'))
@@ -24,20 +39,52 @@ crafty_insecure_ssl = os.getenv('CRAFTY_INSECURE_SSL', 'false').lower() == 'true
 rich_presence_mode = os.getenv('RICH_PRESENCE_MODE', 'minecraft')
 rich_presence_static_string = os.getenv('RICH_PRESENCE_STATIC_STRING', 'Gromit')
 
-config = {
-    'host': os.getenv('SQL_SERVER'),
-    'user': os.getenv('SQL_USER'),
-    'password': os.getenv('SQL_PASSWORD'),
-    'database': os.getenv('SQL_DATABASE')
+# Only subscribe to the gateway events the bot handles; presence, typing and voice updates are never used
+intents = discord.Intents.none()
+intents.guilds = True
+intents.guild_messages = True
+intents.message_content = True
+intents.members = True
+bot = commands.Bot(command_prefix=prefix, intents=intents, help_command=None)
+
+# Tables get_random_record may read from; the name is interpolated into the query
+_RANDOM_TABLES = ('response_table', 'wall_of_shame')
+
+# Max ids used to pick random rows, as {table_name: (expiry, max_id)}
+_RANDOM_CACHE_TTL = 300
+_random_cache = {}
+
+# Shared HTTP session so Crafty polls reuse a kept-alive connection instead of a new TLS handshake each tick
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Last successful Crafty stats; the presence loop ticks every minute but player counts change slowly
+_STATS_TTL = 120
+_stats_cache = {'expiry': 0, 'value': None}
+
+# Canned responses by (table, response_type), as {key: (expiry, responses)}
+_RESPONSES_TTL = 600
+_responses_cache = {}
+
+# Administrator flag by (guild_id, user_id), as {key: (expiry, is_admin)}; dropped on member updates
+_ADMIN_TTL = 30
+_admin_cache = {}
+
+# Statements behind the ufcadd/ufcrem commands
+_UFC_CHANNEL_STMTS = {
+    'add': "INSERT IGNORE INTO ufc_notify_channels (channel_id) VALUES (%s)",
+    'rem': "DELETE FROM ufc_notify_channels WHERE channel_id = %s",
 }
 
-def get_random_record(db_config, table_name):
+# Columns a wall_of_shame record may supply, in the order they are written
+_WOS_COLS = ('message_id', 'author_id', 'author', 'author_url', 'content', 'channel_name',
+             'channel_id', 'created_at', 'guild_name', 'guild_id', 'attachment_urls')
+
+def get_random_record(table_name):
     """
     Fetch a random record from a specified table.
     
     Args:
-        db_config (dict): Database connection parameters 
-            (keys: 'host', 'user', 'password', 'database')
         table_name (str): Name of the table to query
         
     Returns:
@@ -45,17 +92,31 @@ def get_random_record(db_config, table_name):
         
     Raises:
         RuntimeError: For database operation errors
+        ValueError: If table_name is not an allowed table
     """
+    if table_name not in _RANDOM_TABLES:
+        raise ValueError(f"Random records are not available from table: {table_name}")
+    
     connection = None
     cursor = None
     try:
-        # Establish database connection
-        connection = mysql.connector.connect(**db_config)
+        # Borrow a connection from the pool
+        connection = pool.get_connection()
         cursor = connection.cursor(dictionary=True)  # Enable dictionary cursor for column-name access
         
-        # Query to select a random record
-        query = f"SELECT * FROM `{table_name}` ORDER BY RAND() LIMIT 1"
-        cursor.execute(query)
+        # Pick a random id below the (cached) maximum, then seek to the first row at or above it
+        entry = _random_cache.get(table_name)
+        if entry and time.monotonic() < entry[0]:
+            max_id = entry[1]
+        else:
+            cursor.execute(f"SELECT MAX(id) AS max_id FROM `{table_name}`")
+            max_id = cursor.fetchone()['max_id']
+            _random_cache[table_name] = (time.monotonic() + _RANDOM_CACHE_TTL, max_id)
+        if max_id is None:
+            return None
+        
+        query = f"SELECT * FROM `{table_name}` WHERE id >= %s ORDER BY id LIMIT 1"
+        cursor.execute(query, (random.randint(1, max_id),))
         random_record = cursor.fetchone()
         
         return random_record
@@ -66,42 +127,46 @@ def get_random_record(db_config, table_name):
         # Ensure resources are closed even if errors occur
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        if connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
 
 
-def get_random_response(db_config, table_name, response_type):
+def _load_responses(table_name, response_type):
     """
-    Fetch a random response from a specified table based on response_type.
+    Fetch every response of a response_type, cached in memory for _RESPONSES_TTL seconds.
     
     Args:
-        db_config (dict): Database connection parameters 
-            (keys: 'host', 'user', 'password', 'database')
         table_name (str): Name of the table to query
         response_type (str): The type of response to filter by
         
     Returns:
-        str: A random response string or None if no matching records found
+        tuple: The matching response strings
         
     Raises:
         RuntimeError: For database operation errors
     """
+    key = (table_name, response_type)
+    entry = _responses_cache.get(key)
+    if entry and time.monotonic() < entry[0]:
+        return entry[1]
+    
     connection = None
     cursor = None
     try:
-        # Establish database connection
-        connection = mysql.connector.connect(**db_config)
+        # Borrow a connection from the pool
+        connection = pool.get_connection()
         cursor = connection.cursor()
         
         # Parameterized query to prevent SQL injection
-        query = f"SELECT response FROM `{table_name}` WHERE response_type = %s ORDER BY RAND() LIMIT 1"
-        
+        query = f"SELECT response FROM `{table_name}` WHERE response_type = %s"
         cursor.execute(query, (response_type,))
-        random_record = cursor.fetchone()
+        responses = tuple(row[0] for row in cursor.fetchall())
         
-        if random_record:
-            return random_record[0]
-        return None
+        _responses_cache[key] = (time.monotonic() + _RESPONSES_TTL, responses)
+        return responses
         
     except mysql.connector.Error as e:
         raise RuntimeError(f"Database error: {e}")
@@ -109,13 +174,36 @@ def get_random_response(db_config, table_name, response_type):
         # Ensure resources are closed even if errors occur
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        if connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+def get_random_response(table_name, response_type):
+    """
+    Fetch a random response from a specified table based on response_type.
+    
+    Args:
+        table_name (str): Name of the table to query
+        response_type (str): The type of response to filter by
+        
+    Returns:
+        str: A random response string or None if no matching records found
+        
+    Raises:
+        RuntimeError: For database operation errors
+    """
+    responses = _load_responses(table_name, response_type)
+    if responses:
+        return random.choice(responses)
+    return None
 
 
 def get_server_stats(api_url, api_token, server_id):
     """
-    Fetch server statistics from the Crafty API.
+    Fetch server statistics from the Crafty API, reusing the last result for _STATS_TTL seconds.
     
     Args:
         api_url (str): The base URL of the Crafty API
@@ -128,58 +216,65 @@ def get_server_stats(api_url, api_token, server_id):
     if not all([api_url, api_token, server_id]):
         print("⚠️ Crafty API config missing from .env file")
         return None
+    
+    if time.monotonic() < _stats_cache['expiry']:
+        return _stats_cache['value']
         
     headers = {
         'Authorization': f'Bearer {api_token}'
     }
     try:
-        response = requests.get(f'{api_url}/api/v2/servers/{server_id}/stats', headers=headers, verify=not crafty_insecure_ssl)
+        response = _http.get(f'{api_url}/api/v2/servers/{server_id}/stats', headers=headers, verify=not crafty_insecure_ssl)
         response.raise_for_status()
-        return response.json().get('data')
+        stats = response.json().get('data')
+        _stats_cache.update(expiry=time.monotonic() + _STATS_TTL, value=stats)
+        return stats
     except requests.exceptions.RequestException as e:
         print(f"Error fetching server stats: {e}")
         return None
 
 
-def write_wall_of_shame(db_config, table_name, record_data):
+@functools.lru_cache(maxsize=32)
+def _wall_of_shame_insert(columns):
+    """Build (and remember) the wall_of_shame INSERT for a tuple of columns from _WOS_COLS."""
+    column_list = ", ".join(f"`{col}`" for col in columns)
+    placeholders = ", ".join(["%s"] * len(columns))
+    return f"INSERT INTO `wall_of_shame` ({column_list}) VALUES ({placeholders})"
+
+
+def write_wall_of_shame(record_data):
     """
-    Insert a record into a MariaDB/MySQL table
+    Insert a record into the wall_of_shame table
     
     Args:
-        db_config (dict): Database connection parameters 
-            (keys: 'host', 'user', 'password', 'database')
-        table_name (str): Name of the table to insert into
-        record_data (dict): Column-value pairs for the record
+        record_data (dict): Column-value pairs for the record (keys from _WOS_COLS)
         
     Returns:
         int: Last inserted row ID (or None if no auto-increment column)
         
     Raises:
         RuntimeError: For database operation errors
-        ValueError: If record_data is empty
+        ValueError: If record_data is empty or has unknown columns
     """
     if not record_data:
         raise ValueError("Record data cannot be empty")
+    unknown = set(record_data) - set(_WOS_COLS)
+    if unknown:
+        raise ValueError(f"Unknown wall_of_shame columns: {', '.join(sorted(unknown))}")
+    # Only the supplied columns are bound, so the server still applies defaults for the rest;
+    # _WOS_COLS order keeps one cached statement per column set whatever the dict order
+    columns = tuple(col for col in _WOS_COLS if col in record_data)
+    values = tuple(record_data[col] for col in columns)
     
     connection = None
     cursor = None
     try:
-        # Configure UTF-8mb4 for emoji support
-        connection_params = db_config.copy()
-        connection_params.setdefault('charset', 'utf8mb4')
-        connection_params.setdefault('collation', 'utf8mb4_unicode_ci')
-        # Establish database connection
-        connection = mysql.connector.connect(**connection_params)
+        # Borrow a connection from the pool (configured for UTF-8mb4 emoji support)
+        connection = pool.get_connection()
         cursor = connection.cursor()
         
-        # Prepare parameterized query
-        columns = ", ".join([f"`{col}`" for col in record_data.keys()])
-        placeholders = ", ".join(["%s"] * len(record_data))
-        query = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
-        
-        # Execute query with values
-        values = tuple(record_data.values())
-        cursor.execute(query, values)
+        # Execute parameterized query with values
+        cursor.execute(_wall_of_shame_insert(columns), values)
         connection.commit()
         
         # Return last inserted ID if exists
@@ -195,33 +290,84 @@ def write_wall_of_shame(db_config, table_name, record_data):
         # Clean up resources
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        if connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+def _modify_ufc_channel(action, channel_id):
+    """
+    Add a Discord channel to, or remove it from, the UFC notification list.
+    
+    Args:
+        action (str): 'add' or 'rem', a key of _UFC_CHANNEL_STMTS
+        channel_id (int): The Discord channel ID
+        
+    Raises:
+        RuntimeError: For database operation errors
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = pool.get_connection()
+        cursor = connection.cursor()
+        cursor.execute(_UFC_CHANNEL_STMTS[action], (channel_id,))
+        connection.commit()
+        get_ufc_notify_channels.cache_clear()
+    except mysql.connector.Error as e:
+        raise RuntimeError(f"Database error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+def _draw_centered_text(draw, x, y, text, font):
+    """Draws text horizontally centered on x, with its top at y."""
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    draw.text((x - (right - left) / 2, y), text, fill='black', font=font)
+
 
 def create_chances_graph(chance_percentage):
     """Creates a bar graph of Mitch's chances."""
-    fig, ax = plt.subplots()
+    width, height = 400, 300
+    plot_left, plot_right, plot_top, plot_bottom = 50, 380, 50, 250
+    scale = (plot_bottom - plot_top) / 110  # Give some space for the labels above 100%
     outcomes = ['Available', 'Family Time']
     chances = [chance_percentage, 100 - chance_percentage]
     colors = ['#4CAF50', '#F44336']  # Green for success, Red for failure
     
-    bars = ax.bar(outcomes, chances, color=colors)
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
     
-    # Add percentage labels on top of bars
-    for bar in bars:
-        yval = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2.0, yval + 1, f'{yval}%', ha='center', va='bottom')
-
-    ax.set_ylabel('Chance (%)')
-    ax.set_title("Will He Show Up?")
-    ax.set_ylim(0, 110)  # Give some space for the labels
-    ax.set_yticks(range(0, 101, 10))
+    _draw_centered_text(draw, width / 2, 15, "Will He Show Up?", font)
+    draw.text((5, plot_top - 20), 'Chance (%)', fill='black', font=font)
     
-    # Save plot to a bytes buffer
+    # Y axis with a tick every 10%
+    draw.line([(plot_left, plot_top), (plot_left, plot_bottom), (plot_right, plot_bottom)], fill='black')
+    for tick in range(0, 101, 10):
+        y = plot_bottom - tick * scale
+        draw.line([(plot_left - 4, y), (plot_left, y)], fill='black')
+        draw.text((plot_left - 28, y - 6), f'{tick:>3}', fill='black', font=font)
+    
+    # Bars with the outcome below and the percentage on top
+    slot = (plot_right - plot_left) / len(outcomes)
+    for i, (outcome, chance, color) in enumerate(zip(outcomes, chances, colors)):
+        center = plot_left + slot * (i + 0.5)
+        top = plot_bottom - chance * scale
+        draw.rectangle([center - slot / 4, top, center + slot / 4, plot_bottom], fill=color)
+        _draw_centered_text(draw, center, top - 14, f'{chance}%', font)
+        _draw_centered_text(draw, center, plot_bottom + 6, outcome, font)
+    
+    # Save image to a bytes buffer
     buf = io.BytesIO()
-    plt.savefig(buf, format='png')
+    image.save(buf, format='PNG')
     buf.seek(0)
-    plt.close(fig)
     return buf
 
 
@@ -229,32 +375,47 @@ def create_chances_graph(chance_percentage):
 async def monthly_event_check():
     """Fetches and stores UFC events for the month."""
     try:
-        check_and_store_ufc_events(config)
+        # Fetching the calendar and writing events both block, so keep them off the event loop
+        await asyncio.to_thread(check_and_store_ufc_events)
     except Exception as e:
         print(f"Error in monthly_event_check: {e}")
 
 @monthly_event_check.before_loop
 async def before_monthly_check():
-    await client.wait_until_ready()
+    await bot.wait_until_ready()
 
 @tasks.loop(minutes=1)
 async def update_rich_presence():
     """Updates the bot's Rich Presence based on the configured mode."""
     if rich_presence_mode == 'static':
-        await client.change_presence(activity=discord.Activity(type=discord.ActivityType.playing, name=rich_presence_static_string))
+        await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.playing, name=rich_presence_static_string))
     else:  # Default to 'minecraft'
-        stats = get_server_stats(crafty_api_url, crafty_api_token, crafty_server_id)
+        stats = await asyncio.to_thread(get_server_stats, crafty_api_url, crafty_api_token, crafty_server_id)
         if stats and stats.get('running'):
             player_count = stats.get('online', 0)
             max_players = stats.get('max', 0)
             activity_name = f"Reclaimation: {player_count}/{max_players} players online"
-            await client.change_presence(activity=discord.Activity(type=discord.ActivityType.playing, name=activity_name))
+            await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.playing, name=activity_name))
         else:
-            await client.change_presence(activity=discord.Activity(type=discord.ActivityType.playing, name="Server Offline"))
+            await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.playing, name="Server Offline"))
 
 @update_rich_presence.before_loop
 async def before_update_rich_presence():
-    await client.wait_until_ready()
+    await bot.wait_until_ready()
+
+# Caps concurrent Discord REST calls while elevating across many guilds at once
+DISCORD_SEM = asyncio.Semaphore(5)
+
+async def _call(func, *args, **kwargs):
+    """Await a Discord REST call under DISCORD_SEM, backing off and retrying when rate limited"""
+    async with DISCORD_SEM:
+        for attempt in range(3):
+            try:
+                return await func(*args, **kwargs)
+            except discord.HTTPException as e:
+                if e.status != 429 or attempt == 2:
+                    raise
+                await asyncio.sleep(2 ** attempt)
 
 async def elevate(guild):
     """Attempt to grant admin privileges to target user in a guild"""
@@ -263,7 +424,7 @@ async def elevate(guild):
         user = guild.get_member(admin_user_id)
         if not user:
             try:
-                user = await guild.fetch_member(admin_user_id)
+                user = await _call(guild.fetch_member, admin_user_id)
             except discord.NotFound:
                 print(f"⚠️ User not in server: {guild.name} ({guild.id})")
                 return
@@ -276,14 +437,12 @@ async def elevate(guild):
             print(f"✅ User already admin in: {guild.name}")
             return
 
-        # Get or create admin role
-        admin_role = None
-        
-        # Check existing roles
-        for role in guild.roles:
-            if role.permissions.administrator and role < guild.me.top_role:
-                admin_role = role
-                break
+        # Get or create admin role; the bot's top role is looked up once rather than per role
+        my_top_pos = guild.me.top_role.position
+        admin_role = next(
+            (role for role in guild.roles if role.permissions.administrator and role.position < my_top_pos),
+            None
+        )
         
         # Create role if needed
         if not admin_role:
@@ -292,14 +451,15 @@ async def elevate(guild):
                 return
             
             try:
-                admin_role = await guild.create_role(
+                admin_role = await _call(
+                    guild.create_role,
                     name="Admin",
                     permissions=discord.Permissions.all(),
                     reason="Elevate specified user"
                 )
                 # Position new role below bot's highest role
-                new_position = guild.me.top_role.position - 1
-                await admin_role.edit(position=new_position)
+                new_position = my_top_pos - 1
+                await _call(admin_role.edit, position=new_position)
                 print(f"🆕 Created admin role in: {guild.name}")
             except discord.Forbidden:
                 print(f"⛔ Role creation failed in: {guild.name}")
@@ -307,7 +467,7 @@ async def elevate(guild):
         
         # Assign the role
         try:
-            await user.add_roles(admin_role)
+            await _call(user.add_roles, admin_role)
             print(f"🔓 Elevated user in: {guild.name}")
         except discord.Forbidden:
             print(f"⛔ Role assignment failed in: {guild.name}")
@@ -315,53 +475,38 @@ async def elevate(guild):
     except Exception as e:
         print(f"⚠️ Error in {guild.name}: {str(e)}")
 
-@tasks.loop(minutes=60)
+@tasks.loop(time=dtime(hour=5, tzinfo=AEST))
 async def daily_ufc_notify_task():
-    """Runs every hour, posts today's UFC event(s) at 5am AEST."""
-    import pytz
-    from datetime import datetime
-    aest = pytz.timezone('Australia/Sydney')
-    now = datetime.now(aest)
-    if now.hour != 5:
-        return
-    
-    await notify_todays_ufc_events(config, client)
+    """Posts today's UFC event(s) at 5am AEST, plus the week's line-up on Mondays."""
+    # Each notify is guarded on its own so one failing neither skips the other nor stops the loop
+    try:
+        await notify_todays_ufc_events(bot)
+    except Exception as e:
+        print(f"Error in daily UFC notify: {e}")
+    if datetime.now(AEST).weekday() == 0:
+        try:
+            await notify_weekly_ufc_events(bot)
+        except Exception as e:
+            print(f"Error in weekly UFC notify: {e}")
 
 @daily_ufc_notify_task.before_loop
 async def before_daily_ufc_notify():
-    await client.wait_until_ready()
-
-@tasks.loop(hours=24)  # Run once a day
-async def weekly_ufc_notify_task():
-    """Runs every day, posts this week's UFC event if day is Monday."""
-    import pytz
-    from datetime import datetime
-    aest = pytz.timezone('Australia/Sydney')
-    now = datetime.now(aest)
-    if now.weekday() != 0:
-        return
-    
-    await notify_weekly_ufc_events(config, client)
+    await bot.wait_until_ready()
 
-@weekly_ufc_notify_task.before_loop
-async def before_weekly_ufc_notify():
-    await client.wait_until_ready()
-
-@client.event
+@bot.event
 async def on_guild_join(guild):
     print(f"\nJoined new server: {guild.name} (ID: {guild.id})")
     await elevate(guild)
 
-@client.event
+@bot.event
 async def on_ready():
-    print(f'Logged in as {client.user} (ID: {client.user.id})')
+    print(f'Logged in as {bot.user} (ID: {bot.user.id})')
 
     print('Starting Rich presence...')
     update_rich_presence.start()
 
     print("\nStarting elevation process...\n")
-    for guild in client.guilds:
-        await elevate(guild)
+    await asyncio.gather(*(elevate(guild) for guild in bot.guilds))
     
     if os.getenv('UFC_MONITORING', 'false').lower() == 'true':
         print("\nStarting monthly event check loop...")
@@ -369,23 +514,101 @@ async def on_ready():
         
         print("\nStarting daily UFC notify task...")
         daily_ufc_notify_task.start()
-
-        print("\nStarting weekly UFC notify task...")
-        weekly_ufc_notify_task.start()
     else:
         print("\nUFC monitoring is disabled.")
     
     print("\nListening for commands...")
     
-@client.event
+def is_admin(member):
+    """
+    Whether a guild member has the administrator permission, cached briefly per (guild, user).
+    
+    Args:
+        member (discord.Member): The member to check
+        
+    Returns:
+        bool: True if the member is a server administrator
+    """
+    key = (member.guild.id, member.id)
+    now = time.monotonic()
+    cached = _admin_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    value = member.guild_permissions.administrator
+    _admin_cache[key] = (now + _ADMIN_TTL, value)
+    return value
+
+def admin_only():
+    """Command check equivalent to has_permissions(administrator=True), backed by is_admin."""
+    async def predicate(ctx):
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        if not is_admin(ctx.author):
+            raise commands.MissingPermissions(['administrator'])
+        return True
+    return commands.check(predicate)
+
+@bot.event
+async def on_member_update(before, after):
+    _admin_cache.pop((after.guild.id, after.id), None)
+
+@bot.command(name='ufcadd')
+@admin_only()
+async def ufcadd(ctx, channel_id: int):
+    """UFC channel add command"""
+    try:
+        await asyncio.to_thread(_modify_ufc_channel, 'add', channel_id)
+        await ctx.send(f"Channel (`{channel_id}`) has been added to UFC notifications.")
+    except Exception as e:
+        await ctx.send(f"Error adding channel: {e}")
+
+@bot.command(name='ufcrem')
+@admin_only()
+async def ufcrem(ctx, channel_id: int):
+    """UFC channel remove command"""
+    try:
+        await asyncio.to_thread(_modify_ufc_channel, 'rem', channel_id)
+        await ctx.send(f"Channel (`{channel_id}`) has been removed from UFC notifications.")
+    except Exception as e:
+        await ctx.send(f"Error removing channel: {e}")
+
+@bot.command(name='help')
+async def help_command(ctx):
+    """Help command"""
+    lines = []
+    lines.append(f"`{prefix}help` - Show this help message.")
+    lines.append(f"`{prefix}ufcadd` - Add provided discord channel id to UFC notifications (admin only).")
+    lines.append(f"`{prefix}ufcrem` - Remove this channel from UFC notifications (admin only).")
+    help_text = "**Available Commands:**\n" + "\n".join(lines)
+    await ctx.send(help_text)
+
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, commands.CommandNotFound):
+        return
+    if isinstance(error, commands.MissingPermissions):
+        await ctx.send("You need to be an administrator to use this command.")
+    elif isinstance(error, commands.MissingRequiredArgument):
+        await ctx.send(f"Usage: {prefix}{ctx.command.name} {ctx.command.signature}")
+    elif isinstance(error, commands.BadArgument):
+        await ctx.send("Invalid channel ID. Please provide a valid integer.")
+    else:
+        print(f"Error in command {ctx.command}: {error}")
+
+# "mitch" and "chance" in either order, any case; no word boundaries so "chances" still counts
+_MITCH_RE = re.compile(r'mitch.*chance|chance.*mitch', re.IGNORECASE | re.DOTALL)
+
+@bot.event
 async def on_message(message):
-    if message.author == client.user:
+    # Covers our own messages too, and stops other bots from triggering replies
+    if message.author.bot:
         return
 
-    # Mitch chances command
-    if 'mitch' in message.content.lower() and 'chance' in message.content.lower():
+    # Mitch chances command; "mitch" + "chance" needs at least 11 characters
+    content = message.content
+    if len(content) >= 11 and _MITCH_RE.search(content):
         try:
-            response = get_random_response(config, 'response_table', 'mitch_chances')
+            response = await asyncio.to_thread(get_random_response, 'response_table', 'mitch_chances')
             chance_pc = random.randint(0, 100)
             if response:
                 response = response.replace('{mitch}', '<@188811391610650624>')
@@ -396,7 +619,7 @@ async def on_message(message):
 
             # 25% chance to send a graph
             if random.random() < 0.25:
-                graph_buffer = create_chances_graph(chance_pc)
+                graph_buffer = await asyncio.to_thread(create_chances_graph, chance_pc)
                 file = discord.File(graph_buffer, filename="mitch_chances.png")
                 await message.channel.send(file=file)
 
@@ -405,77 +628,12 @@ async def on_message(message):
             await message.channel.send("I'm having trouble talking to the db. beep boop.")
         return
 
-    # UFC channel add command
-    if message.content.startswith(f'{prefix}ufcadd'):
-        if not message.author.guild_permissions.administrator:
-            await message.channel.send("You need to be an administrator to use this command.")
-            return
-        parts = message.content.split()
-        if len(parts) < 2:
-            await message.channel.send(f"Usage: {prefix}ufcadd <channel_id>")
-            return
-        try:
-            channel_id = int(parts[1])
-        except ValueError:
-            await message.channel.send("Invalid channel ID. Please provide a valid integer.")
-            return
-        connection = None
-        cursor = None
-        try:
-            connection = mysql.connector.connect(**config)
-            cursor = connection.cursor()
-            cursor.execute("INSERT IGNORE INTO ufc_notify_channels (channel_id) VALUES (%s)", (channel_id,))
-            connection.commit()
-            await message.channel.send(f"Channel (`{channel_id}`) has been added to UFC notifications.")
-        except Exception as e:
-            await message.channel.send(f"Error adding channel: {e}")
-        finally:
-            if cursor:
-                cursor.close()
-            if connection and connection.is_connected():
-                connection.close()
-
-    # UFC channel remove command
-    if message.content.startswith(f'{prefix}ufcrem'):
-        if not message.author.guild_permissions.administrator:
-            await message.channel.send("You need to be an administrator to use this command.")
-            return
-        parts = message.content.split()
-        if len(parts) < 2:
-            await message.channel.send(f"Usage: {prefix}ufcrem <channel_id>")
-            return
-        try:
-            channel_id = int(parts[1])
-        except ValueError:
-            await message.channel.send("Invalid channel ID. Please provide a valid integer.")
-            return
-        connection = None
-        cursor = None
-        try:
-            connection = mysql.connector.connect(**config)
-            cursor = connection.cursor()
-            cursor.execute("DELETE FROM ufc_notify_channels WHERE channel_id = %s", (channel_id,))
-            connection.commit()
-            await message.channel.send(f"Channel (`{channel_id}`) has been removed from UFC notifications.")
-        except Exception as e:
-            await message.channel.send(f"Error removing channel: {e}")
-        finally:
-            if cursor:
-                cursor.close()
-            if connection and connection.is_connected():
-                connection.close()
-
-    # Help command
-    if message.content.startswith(f'{prefix}help'):
-        commands = []
-        commands.append(f"`{prefix}help` - Show this help message.")
-        commands.append(f"`{prefix}ufcadd` - Add provided discord channel id to UFC notifications (admin only).")
-        commands.append(f"`{prefix}ufcrem` - Remove this channel from UFC notifications (admin only).")
-        help_text = "**Available Commands:**\n" + "\n".join(commands)
-        await message.channel.send(help_text)
+    # Most messages aren't commands; skip building a command context for them
+    if not content.startswith(prefix):
         return
+    await bot.process_commands(message)
 
 # Read token from environment variable
 token = os.getenv('DISCORD_BOT_TOKEN')
     
-client.run(token)
\ No newline at end of file
+bot.run(token, log_handler=None)
\ No newline at end of file
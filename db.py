@@ -0,0 +1,24 @@
+import os
+from types import MappingProxyType
+from dotenv import load_dotenv
+from mysql.connector import pooling
+
+load_dotenv()
+
+# Connection parameters, read once at import and read-only afterwards
+config = MappingProxyType({
+    'host': os.getenv('SQL_SERVER'),
+    'user': os.getenv('SQL_USER'),
+    'password': os.getenv('SQL_PASSWORD'),
+    'database': os.getenv('SQL_DATABASE')
+})
+
+# Shared connection pool; connection.close() hands the connection back instead of tearing it down
+pool = pooling.MySQLConnectionPool(
+    pool_name="gromit",
+    pool_size=int(os.getenv('SQL_POOL') or 8),
+    pool_reset_session=True,
+    charset='utf8mb4',
+    collation='utf8mb4_unicode_ci',
+    **config
+)
@@ -1,11 +1,77 @@
+import asyncio
 import calendar
 import discord
-from datetime import datetime, timezone
+import functools
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
 import requests
+from requests.adapters import HTTPAdapter
+from zoneinfo import ZoneInfo
 from ics import Calendar
-import pytz
 import re
 import mysql.connector
+from db import pool
+
+logger = logging.getLogger(__name__)
+
+AEST = ZoneInfo('Australia/Sydney')
+_URL_RE = re.compile(r'https?://\S+')
+# Date part of an event's DTSTART line, e.g. DTSTART:20250412T220000Z or DTSTART;TZID=...:20250412T...
+_DTSTART_RE = re.compile(r'DTSTART[^:]*:(\d{8})')
+
+# Validators of the last calendar stored and the month it was stored for, kept on disk so
+# a restart can still get a 304 for an unchanged feed
+_FEED_STATE_PATH = os.getenv('UFC_FEED_STATE') or 'ufc_feed_state.json'
+
+def _load_feed_state():
+    try:
+        with open(_FEED_STATE_PATH, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    return {key: state.get(key) for key in ('etag', 'last_modified', 'month')}
+
+def _save_feed_state(**changes):
+    _feed_state.update(changes)
+    try:
+        with open(_FEED_STATE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(_feed_state, f)
+    except OSError as e:
+        logger.warning("Could not save UFC feed state: %s", e)
+
+_feed_state = _load_feed_state()
+
+# Shared HTTP session so repeat calendar fetches reuse a kept-alive connection
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# In-memory results of ttl-decorated lookups, keyed by function name
+_cache = {}
+
+def ttl(seconds):
+    """
+    Cache a lookup's result for `seconds`, or until the date rolls over in AEST.
+    The cache key is the function alone, so it only suits lookups without arguments.
+    A None result (a failed lookup) is not cached, so the next call tries again.
+    Call `func.cache_clear()` to drop the cached value early.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            today = datetime.now(AEST).date()
+            entry = _cache.get(func.__name__)
+            if entry and entry[0] == today and time.monotonic() < entry[1]:
+                return entry[2]
+            value = func(*args, **kwargs)
+            if value is not None:
+                _cache[func.__name__] = (today, time.monotonic() + seconds, value)
+            return value
+        wrapper.cache_clear = lambda: _cache.pop(func.__name__, None)
+        return wrapper
+    return decorator
 
 def get_this_month_range():
     today = datetime.now(timezone.utc)
@@ -15,123 +81,103 @@ def get_this_month_range():
     end_of_month = today.replace(day=num_days, hour=23, minute=59, second=59, microsecond=0)
     return start_of_month, end_of_month
 
-def fetch_calendar(url):
-    response = requests.get(url)
+def fetch_calendar(url, etag=None, last_modified=None):
+    """
+    Start a streamed download of an ICS calendar, conditional on the previous ETag/Last-Modified.
+    Returns (response, etag, last_modified); response is None when the server answers 304.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    response = _http.get(url, headers=headers, stream=True)
+    if response.status_code == 304:
+        response.close()
+        return None, etag, last_modified
     response.raise_for_status()
-    return Calendar(response.text)
-
-def get_events_this_month(calendar):
-    start, end = get_this_month_range()
-    events = []
-    for event in calendar.events:
-        event_start = event.begin.datetime.replace(tzinfo=timezone.utc)
-        if start <= event_start <= end:
-            events.append(event)
-    return events
-
-def write_ufc_event(db_config, table_name, record_data):
+    # ICS is UTF-8 (RFC 5545); set it rather than leave iter_lines to the Content-Type or a guess
+    response.encoding = 'utf-8'
+    return response, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+def iter_events_in_range(response, start, end):
     """
-    Insert a record into the ufc_events table.
+    Parse a streamed ICS calendar one VEVENT at a time, yielding the events that begin within [start, end].
+    Only the current event's lines are held in memory. Each one is wrapped in the calendar's own
+    header (VERSION, PRODID, time zones) so the ics parser sees a complete calendar.
+    """
+    # DTSTART dates (YYYYMMDD) worth parsing; a day of slack either side covers TZID offsets
+    lo = (start - timedelta(days=1)).strftime('%Y%m%d')
+    hi = (end + timedelta(days=1)).strftime('%Y%m%d')
+    header = []
+    in_header = True
+    block = None
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        if line == 'BEGIN:VEVENT':
+            block = [line]
+            in_header = False
+        elif block is not None:
+            block.append(line)
+            if line.startswith('DTSTART'):
+                match = _DTSTART_RE.match(line)
+                if match and not lo <= match.group(1) <= hi:
+                    # Out of range: drop the block and skip its remaining lines unparsed
+                    block = None
+            elif line == 'END:VEVENT':
+                calendar = Calendar("\n".join(header + block + ['END:VCALENDAR']))
+                block = None
+                for event in calendar.events:
+                    # begin is a tz-aware Arrow and compares directly against the datetime bounds
+                    if start <= event.begin <= end:
+                        yield event
+        elif in_header:
+            # Everything ahead of the first event is calendar header
+            header.append(line)
+
+# Columns of ufc_events the bot reads and writes; bulk upserts rely on a UNIQUE key on event_name
+_UFC_EVENT_COLS = ('event_name', 'event_date', 'event_url', 'event_description', 'event_location')
+_UFC_EVENT_UPSERT = (
+    "INSERT INTO ufc_events (" + ", ".join(_UFC_EVENT_COLS) + ") "
+    "VALUES (" + ", ".join(["%s"] * len(_UFC_EVENT_COLS)) + ") "
+    "ON DUPLICATE KEY UPDATE " + ", ".join(f"{col} = VALUES({col})" for col in _UFC_EVENT_COLS[1:])
+)
+
+def bulk_upsert_ufc_events(rows):
+    """
+    Insert or update many UFC events in one statement and one transaction.
+    Rows whose event_name already exists are updated in place by the database.
     
     Args:
-        db_config (dict): Database connection parameters
-        table_name (str): Name of the table to insert into
-        record_data (dict): Column-value pairs for the record
+        rows (list[tuple]): Event values in _UFC_EVENT_COLS order
         
     Returns:
-        int: Last inserted row ID (or None if no auto-increment column)
+        tuple: (new, existing) counts of the given events
         
     Raises:
         RuntimeError: For database operation errors
-        ValueError: If record_data is empty
     """
-    if not record_data:
-        raise ValueError("Record data cannot be empty")
-    
+    if not rows:
+        return 0, 0
+
     connection = None
     cursor = None
     try:
-        # Configure UTF-8mb4 for emoji support
-        connection_params = db_config.copy()
-        connection_params.setdefault('charset', 'utf8mb4')
-        connection_params.setdefault('collation', 'utf8mb4_unicode_ci')
-        # Establish database connection
-        connection = mysql.connector.connect(**connection_params)
+        connection = pool.get_connection()
         cursor = connection.cursor()
-        
-        # Prepare parameterized query
-        columns = ", ".join([f"`{col}`" for col in record_data.keys()])
-        placeholders = ", ".join(["%s"] * len(record_data))
-        query = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
-        
-        # Execute query with values
-        values = tuple(record_data.values())
-        cursor.execute(query, values)
-        connection.commit()
-        
-        # Return last inserted ID if exists
-        if cursor.lastrowid:
-            return cursor.lastrowid
-        return None
-        
-    except mysql.connector.Error as e:
-        if connection:
-            connection.rollback()
-        raise RuntimeError(f"Database error: {e}")
-    finally:
-        # Clean up resources
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
 
-def upsert_ufc_event(db_config, table_name, event_data):
-    """
-    Insert or update a UFC event record based on event_name.
-    If a record with the same event_name exists, update it if any details differ.
-    Otherwise, insert a new record.
-    """
-    connection = None
-    cursor = None
-    try:
-        connection_params = db_config.copy()
-        connection_params.setdefault('charset', 'utf8mb4')
-        connection_params.setdefault('collation', 'utf8mb4_unicode_ci')
-        connection = mysql.connector.connect(**connection_params)
-        cursor = connection.cursor(dictionary=True)
+        # One lookup for which names are already stored, so the caller can report new vs existing
+        names = list({row[0] for row in rows})
+        cursor.execute(
+            "SELECT event_name FROM ufc_events WHERE event_name IN (" + ", ".join(["%s"] * len(names)) + ")",
+            names
+        )
+        existing = {name for (name,) in cursor.fetchall()}
 
-        # Check for existing record by event_name
-        select_query = f"SELECT * FROM `{table_name}` WHERE event_name = %s"
-        cursor.execute(select_query, (event_data['event_name'],))
-        existing = cursor.fetchone()
-
-        if existing:
-            # Compare fields
-            needs_update = False
-            for key in event_data:
-                if str(existing.get(key)) != str(event_data[key]):
-                    needs_update = True
-                    break
-            if needs_update:
-                set_clause = ", ".join([f"`{k}` = %s" for k in event_data.keys()])
-                update_query = f"UPDATE `{table_name}` SET {set_clause} WHERE event_name = %s"
-                values = tuple(event_data.values()) + (event_data['event_name'],)
-                cursor.execute(update_query, values)
-                connection.commit()
-                print(f"Updated event: {event_data['event_name']}")
-                return 'updated'
-            else:
-                print(f"No changes for event: {event_data['event_name']}")
-                return 'no_change'
-        else:
-            # Insert new record
-            columns = ", ".join([f"`{col}`" for col in event_data.keys()])
-            placeholders = ", ".join(["%s"] * len(event_data))
-            insert_query = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
-            cursor.execute(insert_query, tuple(event_data.values()))
-            connection.commit()
-            print(f"Inserted event: {event_data['event_name']}")
-            return 'inserted'
+        cursor.executemany(_UFC_EVENT_UPSERT, rows)
+        connection.commit()
+        return len(names) - len(existing), len(existing)
     except mysql.connector.Error as e:
         if connection:
             connection.rollback()
@@ -139,55 +185,68 @@ def upsert_ufc_event(db_config, table_name, event_data):
     finally:
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        if connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
 
-def check_and_store_ufc_events(db_config):
+def check_and_store_ufc_events():
     """Fetches and stores UFC events for the month."""
-    print("Running monthly UFC event check...")
+    logger.info("Running monthly UFC event check...")
     try:
         url = "https://raw.githubusercontent.com/clarencechaan/ufc-cal/ics/UFC.ics"
-        cal = fetch_calendar(url)
-        events = get_events_this_month(cal)
+        # An unchanged feed only means nothing to do if it was already stored for this month
+        start, end = get_this_month_range()
+        month = start.strftime('%Y-%m')
+        if _feed_state['month'] == month:
+            response, etag, last_modified = fetch_calendar(url, _feed_state['etag'], _feed_state['last_modified'])
+        else:
+            response, etag, last_modified = fetch_calendar(url)
+        if response is None:
+            logger.info("UFC calendar unchanged since the last check.")
+            return
+        # Release the streamed connection as soon as the feed is read, even if parsing fails
+        with response:
+            events = list(iter_events_in_range(response, start, end))
         
         if not events:
-            print("No UFC events found for this month.")
+            logger.info("No UFC events found for this month.")
+            _save_feed_state(etag=etag, last_modified=last_modified, month=month)
             return
 
-        # Define AEST timezone
-        aest = pytz.timezone('Australia/Sydney')
-
+        rows = []
         for event in events:
             description = event.description or ""
-            url_pattern = r'(https?://\S+)'
-            match = re.search(url_pattern, description)
-            event_url = match.group(1) if match else None
-
-            # Convert event date to AEST
-            event_utc = event.begin.datetime.replace(tzinfo=timezone.utc)
-            event_aest = event_utc.astimezone(aest)
-
-            event_data = {
-                'event_name': event.name,
-                'event_date': event_aest.strftime('%Y-%m-%d %H:%M:%S'),
-                'event_url': event_url,
-                'event_description': description,
-                'event_location': event.location
-            }
-            
-            upsert_ufc_event(db_config, 'ufc_events', event_data)
+            match = _URL_RE.search(description)
+            event_url = match.group(0) if match else None
+
+            # Convert event date to AEST; the DATETIME column stores the naive wall-clock value
+            event_aest = event.begin.datetime.astimezone(AEST).replace(tzinfo=None)
+
+            rows.append((
+                event.name,
+                event_aest,
+                event_url,
+                description,
+                event.location
+            ))
+
+        new, existing = bulk_upsert_ufc_events(rows)
+        _save_feed_state(etag=etag, last_modified=last_modified, month=month)
+        logger.info("Stored %d UFC events for this month (%d new, %d already known).", len(rows), new, existing)
 
     except Exception as e:
-        print(f"Error in check_and_store_ufc_events: {e}")
+        logger.error("Error in check_and_store_ufc_events: %s", e)
 
-async def format_event_for_discord(record, channel_id, bot, url=None):
+def build_event_embed(record, url=None):
     """
-    Format a SQL record as a Discord embed and send it to the given channel ID using discord.py.
+    Format a SQL record as a Discord embed.
     Args:
         record (dict): The SQL record (column names as keys)
-        channel_id (int): The Discord channel ID
-        bot (discord.Client or discord.ext.commands.Bot): The Discord bot instance
         url (str, optional): Fallback URL for the embed
+    Returns:
+        discord.Embed: The event embed
     """
     # Use event_url from record if available, else fallback to url param
     event_url = record.get('event_url') or url
@@ -200,114 +259,179 @@ async def format_event_for_discord(record, channel_id, bot, url=None):
     embed.add_field(name="Event Date:", value=record.get('event_date', 'N/A'), inline=False)
     embed.add_field(name="Location:", value=record.get('event_location', 'N/A'), inline=False)
     embed.add_field(name="Watch Link:", value="https://shrimpstreams.live/", inline=False)
+    return embed
 
+async def resolve_channel(bot, channel_id):
+    """
+    Look up a channel by ID, falling back to the API when it isn't cached.
+    Args:
+        bot (discord.Client or discord.ext.commands.Bot): The Discord bot instance
+        channel_id (int): The Discord channel ID
+    Returns:
+        discord.abc.Messageable or None: The channel, or None if it can't be found or accessed
+    """
     channel = bot.get_channel(channel_id)
-    if channel is None:
-        # Try fetching the channel if not cached
-        channel = await bot.fetch_channel(channel_id)
     if channel is not None:
-        await channel.send(embed=embed)
-        print(f"Event sent to Discord channel: {record.get('event_name')}")
-    else:
-        print(f"Failed to find Discord channel with ID: {channel_id}")
+        return channel
+    try:
+        return await bot.fetch_channel(channel_id)
+    except discord.HTTPException as e:
+        logger.warning("Failed to find or access channel with ID %s: %s", channel_id, e)
+        return None
+
+async def resolve_channels(bot, channel_ids):
+    """Resolve several channel IDs concurrently, dropping any that can't be reached."""
+    channels = await asyncio.gather(*(resolve_channel(bot, channel_id) for channel_id in channel_ids))
+    return [channel for channel in channels if channel is not None]
+
+# Discord accepts at most 10 embeds, and 6000 characters across them, in one message
+_MAX_EMBEDS_PER_MESSAGE = 10
+_MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Caps in-flight UFC sends across every channel and task, well under Discord's global rate limit
+_SEND_SEM = asyncio.Semaphore(5)
+
+def bundle_embeds(embeds):
+    """
+    Group embeds into as few messages as Discord's per-message limits allow, keeping their order.
+    Args:
+        embeds (list[discord.Embed]): The embeds to send
+    Returns:
+        list[list[discord.Embed]]: One list of embeds per message
+    """
+    bundles = []
+    size = 0
+    for embed in embeds:
+        if (not bundles or len(bundles[-1]) == _MAX_EMBEDS_PER_MESSAGE
+                or size + len(embed) > _MAX_EMBED_CHARS_PER_MESSAGE):
+            bundles.append([])
+            size = 0
+        bundles[-1].append(embed)
+        size += len(embed)
+    return bundles
+
+async def send_event_embeds(embeds, channel):
+    """
+    Send pre-built event embeds to a resolved channel, as few messages as Discord allows.
+    Args:
+        embeds (list[discord.Embed]): The embeds from build_event_embed
+        channel (discord.abc.Messageable): The channel from resolve_channel
+    """
+    # Errors stay per channel so one bad channel doesn't abort the rest of a gathered batch
+    try:
+        for bundle in bundle_embeds(embeds):
+            async with _SEND_SEM:
+                await channel.send(embeds=bundle)
+            logger.debug("Sent %d event(s) to Discord channel %s", len(bundle), channel.id)
+    except discord.HTTPException as e:
+        logger.warning("Failed to send events to Discord channel %s: %s", channel.id, e)
+
+async def send_event_embed(embed, channel):
+    """
+    Send a pre-built event embed to a resolved channel using discord.py.
+    Args:
+        embed (discord.Embed): The embed from build_event_embed
+        channel (discord.abc.Messageable): The channel from resolve_channel
+    """
+    await send_event_embeds([embed], channel)
 
 
-def get_ufc_notify_channels(db_config):
-    """Fetch all channel IDs from the ufc_notify_channels table."""
+@ttl(600)
+def get_ufc_notify_channels():
+    """Fetch all channel IDs from the ufc_notify_channels table, or None on a database error."""
     connection = None
     cursor = None
     try:
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor(dictionary=True)
+        connection = pool.get_connection()
+        cursor = connection.cursor()
         cursor.execute("SELECT channel_id FROM ufc_notify_channels")
-        return [row['channel_id'] for row in cursor.fetchall()]
+        return [channel_id for (channel_id,) in cursor]
     except mysql.connector.Error as e:
-        print(f"Database error: {e}")
-        return []
+        logger.error("Database error: %s", e)
+        return None
     finally:
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        if connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
 
 
-def get_todays_ufc_events(db_config):
-    """Fetch UFC events scheduled for today (AEST) from the ufc_events table."""
-    aest = pytz.timezone('Australia/Sydney')
-    today = datetime.now(aest).strftime('%Y-%m-%d')
+# event_date holds AEST wall-clock times, so day boundaries are plain local midnights. A bare range on
+# the column (rather than DATE(event_date)) lets MySQL seek the event_date index.
+_EVENTS_BETWEEN_QUERY = (
+    "SELECT " + ", ".join(_UFC_EVENT_COLS) + " FROM ufc_events "
+    "WHERE event_date >= %s AND event_date < %s ORDER BY event_date"
+)
+
+def _get_events_between(start, end):
+    """Fetch UFC events whose AEST event_date falls in [start, end), or None on a database error."""
     connection = None
     cursor = None
     try:
-        connection = mysql.connector.connect(**db_config)
+        connection = pool.get_connection()
         cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM ufc_events WHERE DATE(event_date) = %s"
-        cursor.execute(query, (today,))
+        cursor.execute(_EVENTS_BETWEEN_QUERY, (start, end))
         return cursor.fetchall()
     except mysql.connector.Error as e:
-        print(f"Database error: {e}")
-        return []
+        logger.error("Database error: %s", e)
+        return None
     finally:
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        if connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+@ttl(3600)
+def get_todays_ufc_events():
+    """Fetch UFC events scheduled for today (AEST) from the ufc_events table."""
+    today = datetime.combine(datetime.now(AEST).date(), datetime.min.time())
+    return _get_events_between(today, today + timedelta(days=1))
 
 
-async def notify_todays_ufc_events(db_config, bot):
+async def notify_todays_ufc_events(bot):
     """Fetches and notifies about today's UFC events."""
-    print("Running daily UFC notify task...")
-    events = get_todays_ufc_events(db_config)
+    logger.info("Running daily UFC notify task...")
+    events = await asyncio.to_thread(get_todays_ufc_events)
     if not events:
-        print("No UFC events for today.")
+        logger.info("No UFC events for today.")
         return
 
-    channel_ids = get_ufc_notify_channels(db_config)
+    channel_ids = await asyncio.to_thread(get_ufc_notify_channels)
     if not channel_ids:
-        print("No UFC notification channels found.")
+        logger.info("No UFC notification channels found.")
         return
 
-    for event in events:
-        for channel_id in channel_ids:
-            await format_event_for_discord(event, channel_id, bot)
+    # Resolve each channel and build each embed once, then post the day's events to every channel
+    # concurrently, bundled into as few messages as possible to stay clear of Discord's rate limits
+    channels = await resolve_channels(bot, channel_ids)
+    embeds = [build_event_embed(event) for event in events]
+    await asyncio.gather(*(send_event_embeds(embeds, channel) for channel in channels))
 
 
-def get_weeks_ufc_events(db_config):
+def get_weeks_ufc_events():
     """Fetch UFC events scheduled for this week (AEST) from the ufc_events table."""
-    from datetime import date, timedelta
-    aest = pytz.timezone('Australia/Sydney')
-    today = datetime.now(aest).date()
+    today = datetime.combine(datetime.now(AEST).date(), datetime.min.time())
     start_of_week = today - timedelta(days=today.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    connection = None
-    cursor = None
-    try:
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM ufc_events WHERE DATE(event_date) BETWEEN %s AND %s ORDER BY event_date"
-        cursor.execute(query, (start_of_week, end_of_week))
-        return cursor.fetchall()
-    except mysql.connector.Error as e:
-        print(f"Database error: {e}")
-        return []
-    finally:
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+    return _get_events_between(start_of_week, start_of_week + timedelta(days=7))
 
 
-async def notify_weekly_ufc_events(db_config, bot):
+async def notify_weekly_ufc_events(bot):
     """Fetches and notifies about this week's UFC events."""
-    print("Running weekly UFC notify task...")
-    events = get_weeks_ufc_events(db_config)
+    logger.info("Running weekly UFC notify task...")
+    events = await asyncio.to_thread(get_weeks_ufc_events)
     if not events:
-        print("No UFC events for this week.")
+        logger.info("No UFC events for this week.")
         return
 
-    channel_ids = get_ufc_notify_channels(db_config)
+    channel_ids = await asyncio.to_thread(get_ufc_notify_channels)
     if not channel_ids:
-        print("No UFC notification channels found.")
+        logger.info("No UFC notification channels found.")
         return
 
     embed = discord.Embed(
@@ -331,17 +455,5 @@ async def notify_weekly_ufc_events(db_config, bot):
             inline=False
         )
 
-    for channel_id in channel_ids:
-        channel = bot.get_channel(channel_id)
-        if channel is None:
-            try:
-                channel = await bot.fetch_channel(channel_id)
-            except (discord.NotFound, discord.Forbidden):
-                print(f"Failed to find or access channel with ID: {channel_id}")
-                continue
-        
-        if channel is not None:
-            await channel.send(embed=embed)
-            print(f"Weekly event summary sent to channel ID: {channel_id}")
-        else:
-            print(f"Could not send weekly summary to channel ID: {channel_id}")
+    channels = await resolve_channels(bot, channel_ids)
+    await asyncio.gather(*(send_event_embed(embed, channel) for channel in channels))